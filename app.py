@@ -3,21 +3,52 @@ import logging
 import json
 import threading
 import time
-from flask import Flask, request, jsonify
-from pychromecast import Chromecast, get_chromecasts
+import asyncio
+import concurrent.futures
+import uuid
+import random
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse, Response
+import orjson
+import hashlib
+import uvicorn
+from pychromecast import Chromecast, get_listed_chromecasts, get_chromecast_from_cast_info
+from pychromecast.discovery import CastBrowser, SimpleCastListener
 from pychromecast.controllers.media import MediaController
+import zeroconf
+from pychromecast.socket_client import (
+    ConnectionStatusListener,
+    CONNECTION_STATUS_CONNECTED,
+    CONNECTION_STATUS_DISCONNECTED,
+    CONNECTION_STATUS_FAILED,
+    CONNECTION_STATUS_LOST
+)
 import requests
-from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import atexit
 import signal
 import sys
 from rtsp_processor import RTSPProcessor
 
-app = Flask(__name__)
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Configuration
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 CAST_TIMEOUT = int(os.getenv('CAST_TIMEOUT', 30))
 WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', None)
+POLL_INITIAL_DELAY = 0.1
+POLL_MAX_DELAY = 5.0
+STATUS_MAX_ERRORS = 5
+DEVICE_WAIT_TIMEOUT = 3
+RECONNECT_TIMEOUT = 10  # Seconds a cast waits for a device socket to connect or come back
+DISCOVERY_JITTER = 2
+CAST_POOL_SIZE = 16
+JOB_RETENTION = 600  # Seconds to keep finished cast jobs for polling
+ACTIVE_PLAYER_STATES = frozenset(('PLAYING', 'BUFFERING'))
+INACTIVE_PLAYER_STATES = frozenset(('UNKNOWN', 'IDLE'))  # Also what an empty MediaStatus reports
+BACKDROP_APP_ID = 'E8C28D3C'  # Idle screen, not an active cast
+WORKERS = int(os.getenv('WORKERS', os.cpu_count() or 1))
 
 # Setup logging
 logging.basicConfig(
@@ -26,89 +57,321 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Shared HTTP session so outbound calls reuse pooled keep-alive connections
+HTTP = requests.Session()
+_http_adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.3)
+)
+HTTP.mount('http://', _http_adapter)
+HTTP.mount('https://', _http_adapter)
+HTTP.headers.update({'User-Agent': 'Dashcast/1.0', 'Connection': 'keep-alive'})
+atexit.register(HTTP.close)
+
+# Dedicated pool for blocking Cast socket calls, capping concurrent device handshakes
+CAST_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=CAST_POOL_SIZE, thread_name_prefix='cast')
+
+async def run_cast_call(func, *args):
+    """Run a blocking pychromecast call on the cast pool"""
+    return await asyncio.get_running_loop().run_in_executor(CAST_POOL, func, *args)
+
+class CastConnectionListener(ConnectionStatusListener):
+    """Track whether a cached Cast connection is up; pychromecast reconnects it on its own"""
+    def __init__(self, connected):
+        self.connected = connected
+        
+    def new_connection_status(self, status):
+        if status.status == CONNECTION_STATUS_CONNECTED:
+            self.connected.set()
+        elif status.status in (CONNECTION_STATUS_DISCONNECTED, CONNECTION_STATUS_FAILED, CONNECTION_STATUS_LOST):
+            logger.info(f"Cast connection {status.status.lower()}, next cast waits for the reconnect")
+            self.connected.clear()
+
 class CastManager:
     def __init__(self):
         self.active_casts = {}
         self.rtsp_processor = RTSPProcessor()
-        self.discover_devices()
+        # Discovery callbacks fire on zeroconf threads
+        self._lock = threading.RLock()
+        self._browser = None
+        self._pending_lookups = set()
+        # Set when a device is reported, so a cast can proceed the moment it appears
+        self._device_events = {}
+        # Created on the discovery thread; opening its sockets shouldn't block the event loop
+        self._zconf = None
+        # Background cast jobs for webhooks that don't wait for confirmation
+        self._jobs = {}
+        # Job status files, so a poll routed to any worker finds the job
+        self._jobs_dir = os.path.join(self.rtsp_processor.temp_dir, 'jobs')
+        os.makedirs(self._jobs_dir, exist_ok=True)
+        # In-flight casts keyed by (device_name, rtsp_url); only touched on the event loop
+        self._inflight = {}
+        threading.Thread(target=self._discover_in_background, daemon=True).start()
         
+    def _discover_in_background(self):
+        """Start discovery after a random delay so workers don't query mDNS in one burst"""
+        time.sleep(random.uniform(0, DISCOVERY_JITTER))
+        self._start_discovery()
+    
+    def _start_discovery(self):
+        """Start background mDNS discovery if it is not already running"""
+        try:
+            with self._lock:
+                if self._browser is not None:
+                    return
+                # Devices are added and removed as mDNS announcements come and go
+                logger.info("Discovering Cast devices...")
+                if self._zconf is None:
+                    self._zconf = zeroconf.Zeroconf()
+                self._browser = CastBrowser(
+                    SimpleCastListener(
+                        add_callback=self._on_cast_added,
+                        remove_callback=self._on_cast_removed
+                    ),
+                    self._zconf
+                )
+                self._browser.start_discovery()
+        except Exception as e:
+            logger.error(f"Error starting device discovery: {e}")
+    
+    def _on_cast_added(self, uuid, _service):
+        """Create a Chromecast for a device the browser found"""
+        try:
+            self._on_device(get_chromecast_from_cast_info(self._browser.devices[uuid], self._zconf))
+        except Exception as e:
+            logger.error(f"Error adding Cast device {uuid}: {e}")
+    
+    def _on_cast_removed(self, uuid, _service, _cast_info):
+        """Forget a device that dropped off the network"""
+        with self._lock:
+            name = next((n for n, e in self.active_casts.items() if e['device'].uuid == uuid), None)
+            entry = self.active_casts.pop(name, None)
+        if entry is None:
+            return
+        logger.info(f"Cast device gone: {name}")
+        # Disconnecting joins the socket thread, so keep it off the zeroconf thread
+        threading.Thread(target=self._release_device, args=(entry['device'],), daemon=True).start()
+    
+    def _release_device(self, device):
+        """Release a removed device's stream and close its Cast socket"""
+        try:
+            stream_info = getattr(device, 'stream_info', None)
+            if stream_info:
+                device.stream_info = None
+                self.rtsp_processor.cleanup_stream(stream_info['id'])
+            if device.socket_client.is_alive():
+                device.disconnect(timeout=RECONNECT_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Error releasing Cast device {device.name}: {e}")
+    
+    def _on_device(self, cc):
+        """Record a Cast device reported by discovery"""
+        with self._lock:
+            entry = self.active_casts.get(cc.name)
+            if entry is not None:
+                entry['last_seen'] = time.monotonic()
+                return
+            self.active_casts[cc.name] = {
+                'device': cc,
+                'mc': None,
+                'connected': threading.Event(),
+                'status': 'discovered',
+                'last_seen': time.monotonic()
+            }
+            event = self._device_events.pop(cc.name, None)
+        if event:
+            event.set()
+        logger.info(f"Found Cast device: {cc.name}")
+    
+    def snapshot(self):
+        """Names of the currently known Cast devices"""
+        return list(self.active_casts)
+    
     def discover_devices(self):
         """Discover all available Cast devices on the network"""
+        # The browser keeps active_casts current; just make sure it is running
+        self._start_discovery()
+        return self.snapshot()
+    
+    def schedule_lookup(self, device_name):
+        """Look up a device in the background unless a lookup is already running"""
+        with self._lock:
+            if device_name in self._pending_lookups:
+                return
+            self._pending_lookups.add(device_name)
+        threading.Thread(target=self.lookup_device, args=(device_name,), daemon=True).start()
+    
+    def lookup_device(self, device_name, discovery_timeout=3):
+        """Look up a single Cast device by friendly name"""
         try:
-            logger.info("Discovering Cast devices...")
-            chromecasts = get_chromecasts()
+            # Found devices bind to the discovery zeroconf, so make sure it exists
+            self._start_discovery()
+            # stop_discovery() closes the browser's zeroconf, so the lookup gets its own
+            chromecasts, browser = get_listed_chromecasts(
+                friendly_names=[device_name],
+                discovery_timeout=discovery_timeout
+            )
+            browser.stop_discovery()
             for cc in chromecasts:
-                self.active_casts[cc.name] = {
-                    'device': cc,
-                    'status': 'discovered',
-                    'last_seen': time.time()
-                }
-                logger.info(f"Found Cast device: {cc.name}")
-            return list(self.active_casts.keys())
+                # Rebind to the long-lived zeroconf, which reconnects resolve mDNS names through
+                self._on_device(get_chromecast_from_cast_info(cc.cast_info, self._zconf))
         except Exception as e:
-            logger.error(f"Error discovering devices: {e}")
-            return []
+            logger.error(f"Error looking up device {device_name}: {e}")
+        finally:
+            with self._lock:
+                self._pending_lookups.discard(device_name)
     
-    def get_device(self, device_name):
+    def _get_media_controller(self, device_name, device):
+        """Connect to a device once and return its registered media controller"""
+        entry = self.active_casts.get(device_name)
+        if entry is None:
+            entry = {'device': device, 'mc': None, 'connected': threading.Event()}
+        
+        if entry['mc'] is None:
+            logger.info(f"Connecting to Cast device: {device_name}")
+            # pychromecast keeps retrying in the background, so a later cast can still succeed
+            device.wait(timeout=RECONNECT_TIMEOUT)
+            if not device.status_event.is_set():
+                raise ConnectionError(f"{device_name} did not connect within {RECONNECT_TIMEOUT}s")
+            with self._lock:
+                if entry['mc'] is None:
+                    media_controller = MediaController()
+                    device.register_handler(media_controller)
+                    device.register_connection_listener(CastConnectionListener(entry['connected']))
+                    # The listener only hears about later changes; record the current state
+                    if device.socket_client.is_connected:
+                        entry['connected'].set()
+                    entry['mc'] = media_controller
+        
+        if not entry['connected'].is_set():
+            logger.info(f"Waiting for {device_name} to reconnect")
+            if not entry['connected'].wait(RECONNECT_TIMEOUT):
+                raise ConnectionError(f"{device_name} did not reconnect within {RECONNECT_TIMEOUT}s")
+        return entry['mc']
+    
+    async def get_device(self, device_name, timeout=DEVICE_WAIT_TIMEOUT):
         """Get a specific Cast device by name"""
-        if device_name not in self.active_casts:
-            # Refresh discovery
-            self.discover_devices()
-            
-        if device_name in self.active_casts:
-            return self.active_casts[device_name]['device']
-        return None
+        # Plain dict reads are atomic; only writes take the lock
+        entry = self.active_casts.get(device_name)
+        if entry is None:
+            # Wait only until the device is reported, not for a full scan
+            with self._lock:
+                event = self._device_events.setdefault(device_name, threading.Event())
+                entry = self.active_casts.get(device_name)
+            if entry is None:
+                self.schedule_lookup(device_name)
+                await asyncio.to_thread(event.wait, timeout)
+                entry = self.active_casts.get(device_name)
+            if entry is None:
+                with self._lock:
+                    if self._device_events.get(device_name) is event:
+                        del self._device_events[device_name]
+                return None
+        return entry['device']
     
-    def wait_for_streaming_status(self, device, timeout=CAST_TIMEOUT):
+    @staticmethod
+    def _read_status(device, media_controller):
+        """Read the current media and receiver status of a device"""
+        media_status = media_controller.status if media_controller else None
+        return media_status, getattr(device, 'status', None)
+    
+    async def wait_for_streaming_status(self, device, timeout=CAST_TIMEOUT):
         """Wait for device to start streaming before returning success"""
-        start_time = time.time()
+        deadline = time.monotonic() + timeout
+        delay = POLL_INITIAL_DELAY
+        errors = 0
+        media_controller = getattr(device, 'media_controller', None)
+        last_updated = None
         
-        while time.time() - start_time < timeout:
+        while True:
+            progressed = False
             try:
+                # Both are kept in memory by the socket thread, so read them inline
+                media_status, device_status = self._read_status(device, media_controller)
+                
                 # Check if device is actively playing media
-                if hasattr(device, 'media_controller') and device.media_controller.status:
-                    status = device.media_controller.status
-                    if status.player_state in ['PLAYING', 'BUFFERING']:
-                        logger.info(f"Device {device.name} is streaming (state: {status.player_state})")
+                if media_status:
+                    if media_status.player_state in ACTIVE_PLAYER_STATES:
+                        logger.info(f"Device {device.name} is streaming (state: {media_status.player_state})")
                         return True
+                    # The controller always holds a MediaStatus; only a fresh update
+                    # or a player past idle means the load is under way
+                    progressed = (media_status.player_state not in INACTIVE_PLAYER_STATES
+                                  or media_status.last_updated != last_updated)
+                    last_updated = media_status.last_updated
                 
                 # Check device app status
-                if hasattr(device, 'status') and device.status:
-                    if device.status.app_id and device.status.app_id != 'E8C28D3C':
-                        logger.info(f"Device {device.name} has active app: {device.status.app_id}")
+                if device_status:
+                    if device_status.app_id and device_status.app_id != BACKDROP_APP_ID:
+                        logger.info(f"Device {device.name} has active app: {device_status.app_id}")
                         return True
                         
             except Exception as e:
+                errors += 1
                 logger.debug(f"Status check error for {device.name}: {e}")
             
-            time.sleep(1)
+            if errors >= STATUS_MAX_ERRORS:
+                logger.warning(f"Giving up on {device.name} after {errors} failed status checks")
+                return False
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(delay, remaining))
+            
+            # Keep polling fast while the player is reporting progress, back off otherwise
+            if progressed:
+                delay = POLL_INITIAL_DELAY
+            else:
+                delay = min(delay * 2, POLL_MAX_DELAY)
         
         logger.warning(f"Device {device.name} did not start streaming within {timeout} seconds")
         return False
     
-    def cast_rtsp_stream(self, device_name, rtsp_url):
+    async def cast_rtsp_stream(self, device_name, rtsp_url):
         """Cast RTSP stream to device and wait for streaming confirmation"""
-        device = self.get_device(device_name)
+        key = (device_name, rtsp_url)
+        inflight = self._inflight.get(key)
+        if inflight:
+            # Same stream already being cast to this device: share its outcome
+            logger.info(f"Joining in-flight cast of {rtsp_url} to {device_name}")
+            return await asyncio.shield(inflight)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._cast_rtsp_stream(device_name, rtsp_url)
+            future.set_result(result)
+            return result
+        finally:
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(key, None)
+    
+    async def _cast_rtsp_stream(self, device_name, rtsp_url):
+        """Run a single cast of an RTSP stream to a device"""
+        device = await self.get_device(device_name)
         if not device:
             logger.error(f"Cast device '{device_name}' not found")
             return False, "Device not found"
         
+        stream_info = None
+        stored = False
         try:
             logger.info(f"Processing RTSP stream for {device_name}: {rtsp_url}")
             
             # Process RTSP stream for Cast compatibility
-            success, processed_url, stream_info = self.rtsp_processor.process_stream_for_cast(rtsp_url, device_name)
+            success, processed_url, stream_info = await asyncio.to_thread(
+                self.rtsp_processor.process_stream_for_cast, rtsp_url, device_name
+            )
             
             if not success:
                 logger.error(f"RTSP processing failed for {device_name}: {processed_url}")
                 return False, processed_url  # processed_url contains error message
             
-            logger.info(f"Connecting to Cast device: {device_name}")
-            device.wait()
-            
-            # Create media controller
-            media_controller = MediaController()
-            device.register_handler(media_controller)
+            # Reuse the device connection and media controller from earlier casts
+            media_controller = await run_cast_call(self._get_media_controller, device_name, device)
             
             # Cast the processed stream (HLS/DASH)
             logger.info(f"Casting processed stream to {device_name}: {processed_url}")
@@ -117,35 +380,117 @@ class CastManager:
             content_type = 'application/x-mpegURL' if stream_info and stream_info.get('format') == 'HLS' else 'application/dash+xml'
             
             # Start casting
-            media_controller.play_media(
+            await run_cast_call(
+                media_controller.play_media,
                 processed_url,
                 content_type
             )
             
-            # Block until streaming is confirmed
-            streaming_confirmed = self.wait_for_streaming_status(device)
+            # Wait until streaming is confirmed
+            streaming_confirmed = await self.wait_for_streaming_status(device)
             
             if streaming_confirmed:
                 format_name = stream_info.get('format', 'unknown') if stream_info else 'unknown'
                 logger.info(f"✅ Stream confirmed active on {device_name} ({format_name})")
-                # Store stream info for cleanup
+                # Store stream info for cleanup, releasing whatever the device played before.
+                # Re-casting the same stream took a second reference, so this drops it again.
+                previous = getattr(device, 'stream_info', None)
                 device.stream_info = stream_info
+                stored = True
+                if previous and 'id' in previous:
+                    await asyncio.to_thread(self.rtsp_processor.cleanup_stream, previous['id'])
                 return True, f"Streaming confirmed on {device.name} ({format_name})"
             else:
                 logger.error(f"❌ Stream failed to start on {device_name}")
                 # Cleanup processed stream
                 if stream_info and 'id' in stream_info:
-                    self.rtsp_processor.cleanup_stream(stream_info['id'])
+                    await asyncio.to_thread(self.rtsp_processor.cleanup_stream, stream_info['id'])
                 return False, f"Stream failed to start on {device.name}"
                 
         except Exception as e:
             logger.error(f"Error casting to {device_name}: {e}")
+            # Drop the reference taken for this cast unless the device now holds it
+            if stream_info and 'id' in stream_info and not stored:
+                await asyncio.to_thread(self.rtsp_processor.cleanup_stream, stream_info['id'])
             return False, f"Casting error: {str(e)}"
     
+    async def start_cast_job(self, device_name, rtsp_url):
+        """Start a cast in the background and return a job id to poll"""
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if job['task'].done() and now - job['created_at'] > JOB_RETENTION:
+                del self._jobs[job_id]
+        
+        job_id = str(uuid.uuid4())
+        task = asyncio.create_task(self.cast_rtsp_stream(device_name, rtsp_url))
+        job = self._jobs[job_id] = {
+            'device': device_name,
+            'task': task,
+            'created_at': now
+        }
+        # Job files are disk I/O, so publish them off the event loop
+        await asyncio.to_thread(self._expire_job_files)
+        await asyncio.to_thread(self._write_job_file, job_id, self._job_status(job_id, job))
+        # Added only after the first write, so the final status can't be overwritten by it
+        loop = asyncio.get_running_loop()
+        task.add_done_callback(lambda _: loop.run_in_executor(
+            None, self._write_job_file, job_id, self._job_status(job_id, job)
+        ))
+        return job_id
+    
+    def _job_status(self, job_id, job):
+        """Status dict for a job started by this worker"""
+        task = job['task']
+        status = {'job_id': job_id, 'device': job['device'], 'done': task.done(), 'result': None}
+        if task.cancelled():
+            status['result'] = {'streaming': False, 'message': 'Cast cancelled'}
+        elif task.done():
+            success, message = task.result()
+            status['result'] = {'streaming': success, 'message': message}
+        return status
+    
+    def _write_job_file(self, job_id, status):
+        """Publish a job's status for the other workers"""
+        path = os.path.join(self._jobs_dir, f"{job_id}.json")
+        try:
+            # Write then rename so readers never see a partial file
+            with open(f"{path}.tmp", 'wb') as f:
+                f.write(orjson.dumps(status))
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.error(f"Error saving job {job_id}: {e}")
+    
+    def _expire_job_files(self):
+        """Remove job files last updated more than JOB_RETENTION ago"""
+        cutoff = time.time() - JOB_RETENTION
+        try:
+            with os.scandir(self._jobs_dir) as entries:
+                for entry in entries:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+        except OSError as e:
+            logger.debug(f"Job file cleanup error: {e}")
+    
+    async def get_job_status(self, job_id):
+        """Get status of a background cast job started by any worker"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return self._job_status(job_id, job)
+        return await asyncio.to_thread(self._read_job_file, job_id)
+    
+    def _read_job_file(self, job_id):
+        """Load a job status another worker published, or None"""
+        try:
+            uuid.UUID(job_id)  # Only ever a generated id, never a path
+            with open(os.path.join(self._jobs_dir, f"{job_id}.json"), 'rb') as f:
+                return orjson.loads(f.read())
+        except (OSError, ValueError):
+            return None
+    
     def cleanup_device_streams(self):
         """Clean up processed streams for all devices"""
         try:
-            for device_name, device_info in self.active_casts.items():
+            for device_name, device_info in list(self.active_casts.items()):
                 device = device_info['device']
                 if hasattr(device, 'stream_info') and device.stream_info:
                     self.rtsp_processor.cleanup_stream(device.stream_info['id'])
@@ -160,7 +505,17 @@ class CastManager:
         except Exception as e:
             logger.error(f"Error cleaning up old streams: {e}")
 
-cast_manager = CastManager()
+_cast_manager = None
+_cast_manager_lock = threading.Lock()
+
+def get_cast_manager():
+    """Per-process CastManager, built on first use so each worker discovers on its own"""
+    global _cast_manager
+    if _cast_manager is None:
+        with _cast_manager_lock:
+            if _cast_manager is None:
+                _cast_manager = CastManager()
+    return _cast_manager
 
 def validate_webhook_secret(request):
     """Validate webhook secret if configured"""
@@ -172,127 +527,182 @@ def validate_webhook_secret(request):
 
 def validate_rtsp_url(url):
     """Basic validation of RTSP URL"""
-    try:
-        parsed = urlparse(url)
-        return parsed.scheme in ['rtsp', 'rtmp', 'http', 'https'] and bool(parsed.netloc)
-    except:
-        return False
+    return RTSPProcessor.validate_rtsp_url(url)
+
 
-@app.route('/health', methods=['GET'])
-def health_check():
+def etag_response(request, payload, etag_source=None):
+    """JSON response with an ETag so repeat polls of unchanged data get a 304"""
+    body = orjson.dumps(payload)
+    if etag_source is None:
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    else:
+        # Weak tag: the body may differ in detail but is equivalent to the client
+        etag = f'W/"{hashlib.blake2b(orjson.dumps(etag_source), digest_size=8).hexdigest()}"'
+    headers = {'ETag': etag, 'Cache-Control': 'max-age=5'}
+    
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(',')):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type='application/json', headers=headers)
+
+@app.get('/health')
+async def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return {
         'status': 'healthy',
-        'devices': len(cast_manager.active_casts),
+        'devices': len(get_cast_manager().active_casts),
         'timestamp': time.time()
-    })
+    }
 
-@app.route('/devices', methods=['GET'])
-def list_devices():
+@app.get('/devices')
+async def list_devices(request: Request, refresh: str = '0'):
     """List all available Cast devices"""
-    devices = cast_manager.discover_devices()
-    return jsonify({
+    if refresh == '1':
+        devices = await asyncio.to_thread(get_cast_manager().discover_devices)
+    else:
+        devices = get_cast_manager().snapshot()
+    return etag_response(request, {
         'devices': devices,
         'count': len(devices)
     })
 
-@app.route('/cast/<device_name>', methods=['POST'])
-def cast_to_device(device_name):
+@app.post('/cast/{device_name}')
+async def cast_to_device(device_name: str, request: Request, wait: str = '1'):
     """Cast RTSP stream to specific device"""
     if not validate_webhook_secret(request):
-        return jsonify({'error': 'Unauthorized'}), 401
+        return ORJSONResponse({'error': 'Unauthorized'}, status_code=401)
     
-    data = request.get_json()
-    if not data or 'rtsp_url' not in data:
-        return jsonify({'error': 'rtsp_url required in request body'}), 400
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or 'rtsp_url' not in data:
+        return ORJSONResponse({'error': 'rtsp_url required in request body'}, status_code=400)
     
     rtsp_url = data['rtsp_url']
     if not validate_rtsp_url(rtsp_url):
-        return jsonify({'error': 'Invalid RTSP URL'}), 400
+        return ORJSONResponse({'error': 'Invalid RTSP URL'}, status_code=400)
     
     logger.info(f"Received webhook request to cast {rtsp_url} to {device_name}")
     
+    if wait == '0':
+        # Accept now; the caller polls /jobs/<job_id> for the outcome
+        job_id = await get_cast_manager().start_cast_job(device_name, rtsp_url)
+        return ORJSONResponse({
+            'status': 'accepted',
+            'device': device_name,
+            'job_id': job_id
+        }, status_code=202)
+    
     # Cast and wait for streaming confirmation
-    success, message = cast_manager.cast_rtsp_stream(device_name, rtsp_url)
+    success, message = await get_cast_manager().cast_rtsp_stream(device_name, rtsp_url)
     
     if success:
-        return jsonify({
+        return {
             'status': 'success',
             'device': device_name,
             'message': message,
             'streaming': True
-        })
+        }
     else:
-        return jsonify({
+        return ORJSONResponse({
             'status': 'error',
             'device': device_name,
             'message': message,
             'streaming': False
-        }), 500
+        }, status_code=500)
 
-@app.route('/webhook/<device_name>', methods=['POST'])
-def webhook_endpoint(device_name):
+@app.post('/webhook/{device_name}')
+async def webhook_endpoint(device_name: str, request: Request, wait: str = '1'):
     """Generic webhook endpoint (alias for /cast)"""
-    return cast_to_device(device_name)
+    return await cast_to_device(device_name, request, wait)
 
-@app.route('/streams', methods=['GET'])
-def list_active_streams():
+@app.get('/jobs/{job_id}')
+async def get_cast_job(job_id: str):
+    """Get the outcome of a background cast"""
+    status = await get_cast_manager().get_job_status(job_id)
+    if status is None:
+        return ORJSONResponse({'error': 'Job not found'}, status_code=404)
+    return status
+
+@app.get('/streams')
+async def list_active_streams(request: Request):
     """List all active RTSP streams"""
     try:
-        streams = []
-        for stream_id, stream_info in cast_manager.rtsp_processor.active_streams.items():
-            streams.append(cast_manager.rtsp_processor.get_stream_status(stream_id))
-        return jsonify({
+        # Reads marker files and /proc, so keep it off the event loop
+        streams = await asyncio.to_thread(get_cast_manager().rtsp_processor.snapshot_statuses)
+        # age_seconds moves on every call, so tag only the stream set itself
+        stream_keys = [(s['id'], s['format'], s['processed_url'], s['device_name'], s['viewers']) for s in streams]
+        return etag_response(request, {
             'active_streams': len(streams),
             'streams': streams
-        })
+        }, etag_source=stream_keys)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ORJSONResponse({'error': str(e)}, status_code=500)
 
-@app.route('/streams/<stream_id>', methods=['DELETE'])
-def cleanup_stream(stream_id):
+@app.delete('/streams/{stream_id}')
+async def cleanup_stream(stream_id: str):
     """Clean up a specific stream"""
     try:
-        cast_manager.rtsp_processor.cleanup_stream(stream_id)
-        return jsonify({'status': 'success', 'message': f'Stream {stream_id} cleaned up'})
+        # Streams owned by another worker are released through their shared marker
+        released = await asyncio.to_thread(get_cast_manager().rtsp_processor.cleanup_stream, stream_id)
+        if not released:
+            return ORJSONResponse({'error': 'Stream not found'}, status_code=404)
+        return {'status': 'success', 'message': f'Stream {stream_id} cleaned up'}
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ORJSONResponse({'error': str(e)}, status_code=500)
 
-@app.route('/cleanup', methods=['POST'])
-def cleanup_old_streams():
+@app.post('/cleanup')
+async def cleanup_old_streams():
     """Clean up old streams"""
     try:
-        cast_manager.cleanup_old_streams()
-        cast_manager.cleanup_device_streams()
-        return jsonify({'status': 'success', 'message': 'Old streams cleaned up'})
+        await asyncio.to_thread(get_cast_manager().cleanup_old_streams)
+        await asyncio.to_thread(get_cast_manager().cleanup_device_streams)
+        return {'status': 'success', 'message': 'Old streams cleaned up'}
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ORJSONResponse({'error': str(e)}, status_code=500)
+
+# Background cleanup task
+CLEANUP_INTERVAL = 300  # Run every 5 minutes
+CLEANUP_JITTER = 30
+_cleanup_task = None
 
-# Background cleanup thread
-def cleanup_worker():
-    """Background worker to clean up old streams"""
+async def cleanup_loop():
+    """Background task to clean up old streams"""
     while True:
+        # Jitter keeps worker processes from sweeping in lockstep
+        await asyncio.sleep(CLEANUP_INTERVAL + random.uniform(-CLEANUP_JITTER, CLEANUP_JITTER))
+        if _cast_manager is None:
+            continue  # Nothing has been streamed by this worker yet
         try:
-            time.sleep(300)  # Run every 5 minutes
-            cast_manager.cleanup_old_streams()
+            await asyncio.to_thread(_cast_manager.cleanup_old_streams)
         except Exception as e:
             logger.error(f"Background cleanup error: {e}")
 
+@app.on_event("startup")
+async def startup():
+    """Start background cleanup in each worker"""
+    global _cleanup_task
+    _cleanup_task = asyncio.create_task(cleanup_loop())
+    logger.info("Background cleanup task started")
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background cleanup"""
+    if _cleanup_task:
+        _cleanup_task.cancel()
+        try:
+            await _cleanup_task
+        except asyncio.CancelledError:
+            pass
+
 if __name__ == '__main__':
-    # Discover devices on startup
     logger.info("Starting Dashcast webhook server...")
-    devices = cast_manager.discover_devices()
-    logger.info(f"Found {len(devices)} Cast devices: {', '.join(devices)}")
-    
-    # Start background cleanup thread
-    cleanup_thread = threading.Thread(target=cleanup_worker, daemon=True)
-    cleanup_thread.start()
-    logger.info("Background cleanup thread started")
     
-    # Run Flask app
-    app.run(
+    # Run Uvicorn (ASGI); each worker process serves requests on its own event loop
+    uvicorn.run(
+        "app:app",
         host='0.0.0.0',
         port=8080,
-        debug=False,
-        threaded=True
-    )
\ No newline at end of file
+        workers=WORKERS
+    )
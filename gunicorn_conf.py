@@ -0,0 +1,12 @@
+import multiprocessing
+import os
+
+# Gunicorn configuration for Dashcast
+bind = "0.0.0.0:8080"
+workers = int(os.getenv('WORKERS', multiprocessing.cpu_count()))
+# ASGI app: each worker process runs its own event loop
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 60
+# Each worker builds its own CastManager and runs its own mDNS discovery
+preload_app = False
+loglevel = os.getenv('LOG_LEVEL', 'INFO').lower()
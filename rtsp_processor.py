@@ -6,40 +6,250 @@ import time
 import subprocess
 import json
 import uuid
-from urllib.parse import urlparse
-import ffmpeg
+import fcntl
+import functools
+import http.server
+import hashlib
+import re
+import heapq
+import shutil
+import select
+import ctypes
+import signal
+import contextlib
+import glob
+from urllib.parse import urlsplit
 
 logger = logging.getLogger(__name__)
 
+# Resolve the binaries once so each launch doesn't search PATH
+FFMPEG = shutil.which('ffmpeg') or 'ffmpeg'
+FFPROBE = shutil.which('ffprobe') or 'ffprobe'
+
+# Logging and stdin options passed to every ffmpeg run
+FFMPEG_GLOBAL_ARGS = ['-hide_banner', '-loglevel', 'error', '-nostats', '-nostdin', '-y']
+
+# RTSP input options shared by every conversion: tolerate corrupt packets and
+# broken timestamps from cameras, probe briefly, and give up on a silent socket
+RTSP_INPUT_ARGS = [
+    '-rtsp_transport', 'tcp',
+    '-rtsp_flags', 'prefer_tcp',
+    '-timeout', '5000000',
+    '-fflags', '+nobuffer+discardcorrupt+genpts',
+    '-err_detect', 'ignore_err',
+    '-analyzeduration', '500000',
+    '-probesize', '500000',
+    '-use_wallclock_as_timestamps', '1'
+]
+
+# NVIDIA hardware path: decode on the GPU and keep frames there for NVENC
+NVENC_INPUT_ARGS = ['-hwaccel', 'cuda', '-hwaccel_output_format', 'cuda']
+NVENC_OUTPUT_ARGS = [
+    '-c:v', 'h264_nvenc',
+    '-preset', 'p4',
+    '-tune', 'll',
+    '-rc', 'vbr',
+    '-cq', '23',
+    '-bf', '0',
+    '-zerolatency', '1'
+]
+
+# Software fallback tuned for live latency over compression
+X264_OUTPUT_ARGS = [
+    '-c:v', 'libx264',
+    '-preset', 'faster',
+    '-tune', 'zerolatency',
+    '-crf', '23',
+    '-sc_threshold', '0',
+    '-bf', '0',
+    '-x264opts', 'sliced-threads=1:sync-lookahead=0:rc-lookahead=0'
+]
+
+# Supported stream scheme followed by a non-empty host
+_URL_RE = re.compile(r'^(?:rtsp|rtmp|https?)://[^/\s?#]+', re.IGNORECASE)
+
+# Typical IP camera frame rate, used to size the GOP to the segment length
+ASSUMED_FPS = 30
+
+# How long a successful ffprobe result is reused for the same URL
+PROBE_CACHE_TTL = 30
+
+# How long a new ffmpeg process gets to write its first playlist/manifest
+READY_TIMEOUT = 15
+
+# inotify lets the readiness wait sleep until ffmpeg writes into the stream directory;
+# without it (non-Linux) the wait falls back to polling
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_add_watch = _libc.inotify_add_watch
+    _inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+except (OSError, AttributeError):
+    _inotify_init1 = None
+IN_MOVED_TO = 0x80   # ffmpeg writes playlists to a .tmp file and renames them
+IN_CREATE = 0x100
+READY_POLL_INTERVAL = 0.05
+
+# ffmpeg stderr goes here instead of a pipe; only -loglevel error output is written
+FFMPEG_LOG_NAME = 'ffmpeg.log'
+
+# Only media files are served from temp_dir, not ffmpeg logs, locks or worker markers
+SERVED_EXTENSIONS = ('.m3u8', '.ts', '.mpd', '.m4s', '.mp4')
+
+def _process_start_time(pid):
+    """Start time of a live process from /proc, or None if it's gone or a zombie"""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            fields = f.read().rsplit(b')', 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    return None if fields[0] == b'Z' else int(fields[19])
+
+def _is_running(pid, started):
+    """Whether pid is still the process that was recorded with this start time"""
+    if started is None:
+        # No /proc when the marker was written; fall back to a signal probe
+        try:
+            os.kill(pid, 0)
+            return True
+        except OSError:
+            return False
+    # Pids are reused, notably by a restarted container's workers
+    return _process_start_time(pid) == started
+
+def _stop_pid(pid, started, timeout=2):
+    """Terminate a process we didn't spawn, killing it if it ignores SIGTERM"""
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        if not _is_running(pid, started):
+            return
+        os.kill(pid, sig)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and _is_running(pid, started):
+            time.sleep(0.05)
+
+class SendfileHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve stream files, letting the kernel copy file bodies to the socket"""
+    
+    def send_head(self):
+        if not urlsplit(self.path).path.endswith(SERVED_EXTENSIONS):
+            self.send_error(404, "File not found")
+            return None
+        return super().send_head()
+    
+    def copyfile(self, source, outputfile):
+        try:
+            in_fd = source.fileno()
+            out_fd = self.connection.fileno()
+        except (AttributeError, OSError):
+            # In-memory bodies such as directory listings
+            return super().copyfile(source, outputfile)
+        
+        outputfile.flush()
+        size = os.fstat(in_fd).st_size
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(out_fd, in_fd, offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+
 class RTSPProcessor:
     def __init__(self, temp_dir="/tmp/dashcast"):
         self.temp_dir = temp_dir
         self.active_streams = {}
-        self.stream_locks = {}
+        # Guards active_streams and the expiry heap across request and cleanup threads
+        self._streams_lock = threading.RLock()
+        # url_key -> stream_id, so viewers of the same source share one encode
+        self._url_to_stream = {}
+        # (last_acquired, stream_id), oldest first; ids cleaned up or acquired since are skipped lazily
+        self._expiry_heap = []
         
         # Create temp directory if it doesn't exist
         os.makedirs(temp_dir, exist_ok=True)
+        # temp_dir outlives the process, e.g. across a container restart
+        self._clear_stale_markers()
         
-    def validate_rtsp_url(self, url):
-        """Validate RTSP/RTMP/HTTP stream URL"""
+        # One threaded server for every stream, serving temp_dir with a directory per stream id
+        handler = functools.partial(SendfileHandler, directory=temp_dir)
+        self._httpd = http.server.ThreadingHTTPServer(("localhost", 0), handler)
+        self._port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        logger.info(f"Local HTTP server started on port {self._port} for {temp_dir}")
+        
+        # Detected on the first encode, on a setup thread rather than whoever builds the processor
+        self._has_nvenc = None
+        self._nvenc_lock = threading.Lock()
+        
+        # Recent successful probes: url -> (monotonic time, is_valid, stream_info)
+        self._probe_cache = {}
+        self._probe_lock = threading.Lock()
+        
+    def _nvenc_available(self):
+        """Whether NVENC can be used, detecting it once on first call"""
+        if self._has_nvenc is None:
+            with self._nvenc_lock:
+                if self._has_nvenc is None:
+                    self._has_nvenc = self._detect_nvenc()
+        return self._has_nvenc
+    
+    def _detect_nvenc(self):
+        """Check that ffmpeg has h264_nvenc and a usable NVIDIA GPU"""
         try:
-            parsed = urlparse(url)
-            valid_schemes = ['rtsp', 'rtmp', 'http', 'https']
-            return parsed.scheme in valid_schemes and bool(parsed.netloc)
+            result = subprocess.run(
+                [FFMPEG, '-hide_banner', '-encoders'],
+                capture_output=True, text=True, timeout=10
+            )
+            if 'h264_nvenc' not in result.stdout:
+                return False
+            
+            # Builds often list NVENC without a GPU present; encode one test frame
+            result = subprocess.run(
+                [FFMPEG, '-hide_banner', '-loglevel', 'error',
+                 '-f', 'lavfi', '-i', 'color=black:s=256x256:d=0.1',
+                 '-c:v', 'h264_nvenc', '-f', 'null', '-'],
+                capture_output=True, text=True, timeout=10
+            )
+            if result.returncode == 0:
+                logger.info("NVENC hardware encoding available")
+                return True
+            return False
         except Exception as e:
-            logger.error(f"URL validation error: {e}")
+            logger.debug(f"NVENC detection failed: {e}")
             return False
     
+    @staticmethod
+    def validate_rtsp_url(url):
+        """Validate RTSP/RTMP/HTTP stream URL"""
+        return isinstance(url, str) and _URL_RE.match(url) is not None
+    
     def test_stream_connectivity(self, url, timeout=10):
-        """Test if we can connect to the RTSP stream"""
+        """Test if we can connect to the RTSP stream, reusing a recent successful probe"""
+        now = time.monotonic()
+        with self._probe_lock:
+            cached = self._probe_cache.get(url)
+        if cached and now - cached[0] < PROBE_CACHE_TTL:
+            logger.debug(f"Using cached probe for: {url}")
+            return cached[1], dict(cached[2])
+        
+        is_valid, stream_info = self._probe_stream(url, timeout)
+        if is_valid:
+            with self._probe_lock:
+                for cached_url, entry in list(self._probe_cache.items()):
+                    if now - entry[0] >= PROBE_CACHE_TTL:
+                        del self._probe_cache[cached_url]
+                self._probe_cache[url] = (time.monotonic(), True, dict(stream_info))
+        return is_valid, stream_info
+    
+    def _probe_stream(self, url, timeout):
+        """Probe the stream with ffprobe"""
         try:
             logger.info(f"Testing connectivity to: {url}")
             
             # Use FFprobe to check stream
             cmd = [
-                'ffprobe',
+                FFPROBE,
                 '-v', 'error',
-                '-show_entries', 'stream=codec_name,width,height,avg_frame_rate',
+                '-show_entries', 'stream=codec_type,codec_name,width,height',
                 '-of', 'json',
                 '-timeout', str(timeout * 1000000),  # microseconds
                 url
@@ -50,9 +260,11 @@ class RTSPProcessor:
             if result.returncode == 0:
                 probe_data = json.loads(result.stdout)
                 if probe_data.get('streams'):
-                    video_stream = next((s for s in probe_data['streams'] if s['codec_type'] == 'video'), None)
+                    video_stream = next((s for s in probe_data['streams'] if s.get('codec_type') == 'video'), None)
+                    audio_stream = next((s for s in probe_data['streams'] if s.get('codec_type') == 'audio'), None)
                     if video_stream:
-                        logger.info(f"Stream validated: {video_stream.get('codec_name')} {video_stream.get('width')}x{video_stream.get('height')}")
+                        video_stream['audio_codec'] = audio_stream.get('codec_name') if audio_stream else None
+                        logger.info(f"Stream validated: {video_stream.get('codec_name')} {video_stream.get('width')}x{video_stream.get('height')} audio={video_stream['audio_codec']}")
                         return True, video_stream
             
             logger.error(f"Stream probe failed: {result.stderr}")
@@ -65,7 +277,134 @@ class RTSPProcessor:
             logger.error(f"Stream connectivity test failed: {e}")
             return False, None
     
-    def convert_to_hls(self, rtsp_url, output_path, segment_time=2):
+    def _encoder_args(self, segment_time):
+        """ffmpeg input/output options for H.264 with a keyframe on every segment boundary"""
+        gop = str(segment_time * ASSUMED_FPS)
+        if self._nvenc_available():
+            return NVENC_INPUT_ARGS, NVENC_OUTPUT_ARGS + ['-g', gop]
+        return [], X264_OUTPUT_ARGS + ['-g', gop, '-keyint_min', gop]
+    
+    def _hls_output_args(self, hls_dir, segment_time):
+        """HLS muxer options shared by the transcode and stream copy paths"""
+        return [
+            '-f', 'hls',
+            '-hls_time', str(segment_time),
+            # Short first segment so Cast receivers can start playing sooner
+            '-hls_init_time', '1',
+            '-hls_list_size', '6',
+            # No hls_playlist_type=event: ffmpeg keeps every segment of an event playlist
+            '-hls_flags', 'delete_segments+append_list+independent_segments+program_date_time+omit_endlist',
+            # Keep only one unreferenced segment around before deleting it
+            '-hls_delete_threshold', '1',
+            '-hls_segment_type', 'mpegts',
+            '-hls_segment_filename', f'{hls_dir}/segment_%03d.ts',
+            '-flush_packets', '1'
+        ]
+    
+    def _start_ffmpeg(self, rtsp_url, input_args, output_args, output_path):
+        """Launch ffmpeg detached, with errors going to a log file next to the output"""
+        cmd = [FFMPEG, *FFMPEG_GLOBAL_ARGS, *input_args, '-i', rtsp_url, *output_args, output_path]
+        log_path = os.path.join(os.path.dirname(output_path), FFMPEG_LOG_NAME)
+        with open(log_path, 'wb') as log_file:
+            return subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=log_file)
+    
+    def _open_wait_fds(self, proc, watch_dir):
+        """Open fds that become readable when files appear in watch_dir or proc exits"""
+        fds = []
+        if _inotify_init1 is not None:
+            fd = _inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0 and _inotify_add_watch(fd, os.fsencode(watch_dir), IN_CREATE | IN_MOVED_TO) >= 0:
+                fds.append(fd)
+            elif fd >= 0:
+                os.close(fd)
+        if fds and hasattr(os, 'pidfd_open'):
+            try:
+                fds.append(os.pidfd_open(proc.pid))
+            except OSError:
+                pass
+        return fds
+    
+    def _wait_until_ready(self, proc, ready_path, label, timeout=READY_TIMEOUT):
+        """Wait for a launched ffmpeg to write ready_path, stopping it if it fails first"""
+        fds = self._open_wait_fds(proc, os.path.dirname(ready_path))
+        try:
+            return self._wait_for_output(proc, ready_path, label, timeout, fds)
+        finally:
+            for fd in fds:
+                os.close(fd)
+    
+    def _wait_for_output(self, proc, ready_path, label, timeout, fds):
+        """Sleep on the wait fds (or poll without them) until ready_path exists"""
+        deadline = time.monotonic() + timeout
+        # Without a pidfd, wake up periodically to notice ffmpeg exiting
+        interval = None if len(fds) == 2 else READY_POLL_INTERVAL
+        while not os.path.exists(ready_path):
+            if proc.poll() is not None:
+                log_path = os.path.join(os.path.dirname(ready_path), FFMPEG_LOG_NAME)
+                try:
+                    with open(log_path, 'rb') as f:
+                        details = f.read().decode(errors='replace').strip()
+                except OSError:
+                    details = ''
+                error_msg = f"FFmpeg {label} failed (exit {proc.returncode}): {details}"
+                logger.error(error_msg)
+                return None, error_msg
+            if time.monotonic() >= deadline:
+                self._stop_ffmpeg(proc)
+                error_msg = f"FFmpeg {label} produced no output within {timeout}s"
+                logger.error(error_msg)
+                return None, error_msg
+            wait = deadline - time.monotonic()
+            if interval is not None:
+                wait = min(wait, interval)
+            if not fds:
+                time.sleep(max(wait, 0))
+                continue
+            readable, _, _ = select.select(fds, [], [], max(wait, 0))
+            if fds[0] in readable:
+                # Drain the queued events; the loop re-checks for ready_path itself
+                try:
+                    while os.read(fds[0], 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+        
+        logger.info(f"{label} running: {ready_path}")
+        return proc, None
+    
+    def _stop_ffmpeg(self, proc):
+        """Terminate an ffmpeg process, killing it if it doesn't exit promptly"""
+        if proc.poll() is not None:
+            return
+        proc.terminate()
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    
+    def convert_to_hls_copy(self, rtsp_url, output_path, audio_codec=None, segment_time=1):
+        """Remux an H.264 RTSP stream to HLS without re-encoding the video"""
+        try:
+            logger.info(f"Remuxing RTSP to HLS: {rtsp_url} -> {output_path}")
+            
+            hls_dir = os.path.dirname(output_path)
+            os.makedirs(hls_dir, exist_ok=True)
+            
+            # Only transcode audio when the source isn't already AAC
+            acodec = 'copy' if audio_codec in (None, 'aac') else 'aac'
+            
+            output_args = ['-c:v', 'copy', '-c:a', acodec] + self._hls_output_args(hls_dir, segment_time)
+            proc = self._start_ffmpeg(rtsp_url, RTSP_INPUT_ARGS, output_args, output_path)
+            
+            return self._wait_until_ready(proc, output_path, "HLS remux")
+            
+        except Exception as e:
+            error_msg = f"HLS remux error: {e}"
+            logger.error(error_msg)
+            return None, error_msg
+    
+    def convert_to_hls(self, rtsp_url, output_path, segment_time=1):
         """Convert RTSP stream to HLS format for Cast compatibility"""
         try:
             logger.info(f"Converting RTSP to HLS: {rtsp_url} -> {output_path}")
@@ -74,47 +413,20 @@ class RTSPProcessor:
             hls_dir = os.path.dirname(output_path)
             os.makedirs(hls_dir, exist_ok=True)
             
+            hw_args, video_args = self._encoder_args(segment_time)
+            
             # FFmpeg command for RTSP to HLS conversion
-            (
-                ffmpeg
-                .input(rtsp_url, 
-                    rtsp_transport='tcp',
-                    rtsp_flags='prefer_tcp',
-                    fflags='nobuffer',
-                    analyzeduration='10000000',
-                    probesize='1000000')
-                .output(
-                    output_path,
-                    vcodec='libx264',
-                    acodec='aac',
-                    format='hls',
-                    hls_time=segment_time,
-                    hls_list_size=3,
-                    hls_flags='delete_segments+append_list',
-                    hls_segment_type='mpegts',
-                    hls_segment_filename=f'{hls_dir}/segment_%03d.ts',
-                    g=60,  # GOP size
-                    preset='fast',
-                    crf=23,
-                    movflags='frag_keyframe+empty_moov'
-                )
-                .overwrite_output()
-                .run(capture_stdout=True, capture_stderr=True)
-            )
+            output_args = video_args + ['-c:a', 'aac'] + self._hls_output_args(hls_dir, segment_time)
+            proc = self._start_ffmpeg(rtsp_url, RTSP_INPUT_ARGS + hw_args, output_args, output_path)
             
-            logger.info(f"HLS conversion successful: {output_path}")
-            return True, None
+            return self._wait_until_ready(proc, output_path, "HLS conversion")
             
-        except ffmpeg.Error as e:
-            error_msg = f"FFmpeg HLS conversion failed: {e.stderr.decode()}"
-            logger.error(error_msg)
-            return False, error_msg
         except Exception as e:
             error_msg = f"HLS conversion error: {e}"
             logger.error(error_msg)
-            return False, error_msg
+            return None, error_msg
     
-    def convert_to_dash(self, rtsp_url, output_path):
+    def convert_to_dash(self, rtsp_url, output_path, segment_time=3):
         """Convert RTSP stream to DASH format for Cast compatibility"""
         try:
             logger.info(f"Converting RTSP to DASH: {rtsp_url} -> {output_path}")
@@ -122,107 +434,235 @@ class RTSPProcessor:
             dash_dir = os.path.dirname(output_path)
             os.makedirs(dash_dir, exist_ok=True)
             
-            (
-                ffmpeg
-                .input(rtsp_url,
-                    rtsp_transport='tcp',
-                    rtsp_flags='prefer_tcp',
-                    fflags='nobuffer')
-                .output(
-                    output_path,
-                    vcodec='libx264',
-                    acodec='aac',
-                    format='dash',
-                    window_size=3,
-                    extra_window_size=1,
-                    seg_duration=3,
-                    frag_duration=1,
-                    target_latency=5,
-                    streaming=1,
-                    remove_at_exit=1
-                )
-                .overwrite_output()
-                .run(capture_stdout=True, capture_stderr=True)
-            )
+            hw_args, video_args = self._encoder_args(segment_time)
             
-            logger.info(f"DASH conversion successful: {output_path}")
-            return True, None
+            output_args = video_args + [
+                '-c:a', 'aac',
+                '-f', 'dash',
+                '-window_size', '3',
+                '-extra_window_size', '1',
+                '-seg_duration', str(segment_time),
+                '-frag_duration', '1',
+                '-target_latency', '5',
+                '-streaming', '1',
+                '-remove_at_exit', '1'
+            ]
+            proc = self._start_ffmpeg(rtsp_url, RTSP_INPUT_ARGS + hw_args, output_args, output_path)
+            
+            return self._wait_until_ready(proc, output_path, "DASH conversion")
             
-        except ffmpeg.Error as e:
-            error_msg = f"FFmpeg DASH conversion failed: {e.stderr.decode()}"
-            logger.error(error_msg)
-            return False, error_msg
         except Exception as e:
             error_msg = f"DASH conversion error: {e}"
             logger.error(error_msg)
-            return False, error_msg
+            return None, error_msg
+    
+    def _url_key(self, rtsp_url):
+        """File-safe key shared by every worker process for a stream URL"""
+        return hashlib.sha1(rtsp_url.encode()).hexdigest()
     
-    def create_local_http_server(self, stream_dir, port=0):
-        """Create a local HTTP server to serve HLS/DASH segments"""
+    def _marker_path(self, url_key):
+        """Path of the marker that publishes a URL's stream to every worker"""
+        return os.path.join(self.temp_dir, f"{url_key}.json")
+    
+    def _read_marker(self, url_key):
+        """Load the published marker for a URL, or None"""
         try:
-            import http.server
-            import socketserver
-            from threading import Thread
-            
-            # Find an available port
-            if port == 0:
-                with socketserver.TCPServer(("localhost", 0), http.server.SimpleHTTPRequestHandler) as s:
-                    port = s.server_address[1]
-            
-            handler = http.server.SimpleHTTPRequestHandler
-            httpd = socketserver.TCPServer(("localhost", port), handler)
-            
-            # Change to stream directory
-            os.chdir(stream_dir)
-            
-            # Start server in a separate thread
-            server_thread = Thread(target=httpd.serve_forever, daemon=True)
-            server_thread.start()
-            
-            logger.info(f"Local HTTP server started on port {port} for {stream_dir}")
-            return f"http://localhost:{port}", httpd, server_thread
-            
-        except Exception as e:
-            logger.error(f"Failed to start HTTP server: {e}")
-            return None, None, None
+            with open(self._marker_path(url_key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_marker(self, url_key, marker):
+        """Publish a marker; callers hold the URL lock"""
+        path = self._marker_path(url_key)
+        # Write then rename so readers never see a partial marker
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(marker, f)
+        os.replace(f"{path}.tmp", path)
+    
+    def _withdraw_marker(self, url_key, stream_id):
+        """Remove the URL's marker if it still points at this stream"""
+        marker = self._read_marker(url_key)
+        if marker and marker.get('id') == stream_id:
+            try:
+                os.remove(self._marker_path(url_key))
+            except OSError:
+                pass
+    
+    @staticmethod
+    def _marker_alive(marker):
+        """Whether both the owning worker and its ffmpeg are still running"""
+        try:
+            return (_is_running(marker['pid'], marker['pid_started'])
+                    and _is_running(marker['ffmpeg_pid'], marker['ffmpeg_started']))
+        except (KeyError, TypeError):
+            return False
+    
+    def _iter_markers(self):
+        """Yield (url_key, marker) for every readable published marker"""
+        for path in glob.glob(os.path.join(self.temp_dir, '*.json')):
+            url_key = os.path.basename(path)[:-len('.json')]
+            marker = self._read_marker(url_key)
+            if marker is not None:
+                yield url_key, marker
+    
+    def _find_marker(self, stream_id):
+        """URL key and marker of a published stream, searched by stream id"""
+        for url_key, marker in self._iter_markers():
+            if marker.get('id') == stream_id:
+                return url_key, marker
+        return None, None
+    
+    @contextlib.contextmanager
+    def _url_lock(self, url_key):
+        """Hold the per-URL lock that serializes setup and release across worker processes"""
+        lock_path = os.path.join(self.temp_dir, f"{url_key}.lock")
+        while True:
+            lock_file = open(lock_path, 'a')
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # A stale-lock sweep may have unlinked the file while we waited on it
+                if os.fstat(lock_file.fileno()).st_ino == os.stat(lock_path).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+        with lock_file:
+            yield
+    
+    def _clear_stale_markers(self):
+        """Remove markers and lock files left behind by processes that are gone"""
+        for path in glob.glob(os.path.join(self.temp_dir, '*.json')):
+            # Markers are replaced atomically, so an unreadable one is corrupt rather than mid-write
+            marker = self._read_marker(os.path.basename(path)[:-len('.json')])
+            if marker is None or not self._marker_alive(marker):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        for lock_path in glob.glob(os.path.join(self.temp_dir, '*.lock')):
+            if os.path.exists(lock_path[:-len('.lock')] + '.json'):
+                continue
+            try:
+                with open(lock_path, 'a') as lock_file:
+                    # Skip locks that a live worker is holding right now
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    os.remove(lock_path)
+            except OSError:
+                pass
+    
+    def _add_viewers(self, url_key, stream_id, delta):
+        """Adjust the cross-worker viewer count in a stream's marker; returns the new count"""
+        marker = self._read_marker(url_key)
+        if not marker or marker.get('id') != stream_id:
+            return None
+        marker['viewers'] = max(marker.get('viewers', 1) + delta, 0)
+        if delta > 0:
+            marker['last_acquired'] = time.time()
+        self._write_marker(url_key, marker)
+        return marker['viewers']
+    
+    def _join_shared_stream(self, url_key):
+        """Add a viewer to a stream another worker publishes for this URL, if it is still live"""
+        marker = self._read_marker(url_key)
+        if marker is None:
+            return None
+        # A marker under our own pid that isn't in active_streams is left from a previous process
+        if marker.get('pid') == os.getpid() or not self._marker_alive(marker):
+            logger.info(f"Discarding stale stream marker {marker.get('id')}")
+            self._withdraw_marker(url_key, marker.get('id'))
+            return None
+        marker['viewers'] = marker.get('viewers', 1) + 1
+        # Tells the owner a viewer joined, so it doesn't expire the stream under them
+        marker['last_acquired'] = time.time()
+        self._write_marker(url_key, marker)
+        return marker
+    
+    def _acquire_local_stream(self, url_key):
+        """Add a viewer to this worker's running stream for the URL, if there is one"""
+        with self._streams_lock:
+            stream_id = self._url_to_stream.get(url_key)
+            stream_info = self.active_streams.get(stream_id)
+            alive = stream_info is not None and stream_info['ffmpeg_proc'].poll() is None
+            if alive:
+                stream_info['refcount'] += 1
+                stream_info['last_acquired'] = time.time()
+                heapq.heappush(self._expiry_heap, (stream_info['last_acquired'], stream_id))
+        if alive:
+            self._add_viewers(url_key, stream_id, 1)
+            return stream_info
+        if stream_info:
+            logger.warning(f"FFmpeg for stream {stream_id} exited, starting a new one")
+            self._teardown(stream_id)
+        return None
+    
+    def _watch_ffmpeg(self, stream_id, proc):
+        """Tear a stream down as soon as its ffmpeg exits, so other workers stop joining it"""
+        proc.wait()
+        with self._streams_lock:
+            stream_info = self.active_streams.get(stream_id)
+            current = stream_info is not None and stream_info['ffmpeg_proc'] is proc
+        if current:
+            logger.warning(f"FFmpeg for stream {stream_id} exited with code {proc.returncode}")
+            self.cleanup_stream(stream_id, force=True)
     
     def process_stream_for_cast(self, rtsp_url, device_name=None):
         """Process RTSP stream for Cast device compatibility"""
+        url_key = self._url_key(rtsp_url)
+        
+        try:
+            # Serialize setup of the same URL across worker processes so each
+            # source gets a single transcoder
+            with self._url_lock(url_key):
+                local = self._acquire_local_stream(url_key)
+                if local:
+                    logger.info(f"Reusing stream {local['id']} ({local['refcount']} local viewers): {local['processed_url']}")
+                    return True, local['processed_url'], local
+                shared = self._join_shared_stream(url_key)
+                if shared:
+                    logger.info(f"Reusing stream {shared['id']} from worker {shared['pid']}: {shared['processed_url']}")
+                    return True, shared['processed_url'], shared
+                return self._process_stream(rtsp_url, device_name, url_key)
+        except OSError as e:
+            error_msg = f"Stream processing failed: {e}"
+            logger.error(error_msg)
+            return False, error_msg, None
+    
+    def _process_stream(self, rtsp_url, device_name, url_key):
+        """Set up conversion and serving for a new stream"""
         stream_id = str(uuid.uuid4())
         stream_dir = os.path.join(self.temp_dir, stream_id)
+        proc = None
         
         try:
-            os.makedirs(stream_dir, exist_ok=True)
-            
-            # Test stream connectivity first
+            # Test stream connectivity first; each setup already runs on its own thread
             is_valid, stream_info = self.test_stream_connectivity(rtsp_url)
             if not is_valid:
                 return False, "Invalid or unreachable RTSP stream", None
             
-            # Convert to HLS (preferred for Cast)
+            # Convert to HLS (preferred for Cast); H.264 sources only need remuxing.
+            # Each converter returns once ffmpeg is running and has written its playlist.
             hls_path = os.path.join(stream_dir, "playlist.m3u8")
-            success, error = self.convert_to_hls(rtsp_url, hls_path)
+            if stream_info.get('codec_name') == 'h264':
+                proc, error = self.convert_to_hls_copy(rtsp_url, hls_path, stream_info.get('audio_codec'))
+            if proc is None:
+                proc, error = self.convert_to_hls(rtsp_url, hls_path)
+            format_type = "HLS"
             
-            if not success:
+            if proc is None:
                 # Try DASH as fallback
                 dash_path = os.path.join(stream_dir, "manifest.mpd")
-                success, error = self.convert_to_dash(rtsp_url, dash_path)
-                if not success:
+                proc, error = self.convert_to_dash(rtsp_url, dash_path)
+                if proc is None:
                     return False, f"Both HLS and DASH conversion failed: {error}", None
+                format_type = "DASH"
             
-            # Create local HTTP server
-            server_url, httpd, server_thread = self.create_local_http_server(stream_dir)
-            
-            if not server_url:
-                return False, "Failed to create local HTTP server", None
-            
-            # Determine final URL
-            if os.path.exists(hls_path):
+            # Determine final URL on the shared local server
+            server_url = f"http://localhost:{self._port}/{stream_id}"
+            if format_type == "HLS":
                 stream_url = f"{server_url}/playlist.m3u8"
-                format_type = "HLS"
             else:
                 stream_url = f"{server_url}/manifest.mpd"
-                format_type = "DASH"
             
             # Store stream info for cleanup
             stream_info = {
@@ -231,60 +671,158 @@ class RTSPProcessor:
                 'original_url': rtsp_url,
                 'processed_url': stream_url,
                 'format': format_type,
-                'httpd': httpd,
-                'server_thread': server_thread,
+                'ffmpeg_proc': proc,
                 'created_at': time.time(),
+                'url_key': url_key,
+                'refcount': 1,
                 'stream_info': stream_info
             }
+            stream_info['last_acquired'] = stream_info['created_at']
+            
+            with self._streams_lock:
+                self.active_streams[stream_id] = stream_info
+                self._url_to_stream[url_key] = stream_id
+                heapq.heappush(self._expiry_heap, (stream_info['last_acquired'], stream_id))
             
-            self.active_streams[stream_id] = stream_info
+            threading.Thread(target=self._watch_ffmpeg, args=(stream_id, proc), daemon=True).start()
+            
+            # Publish the stream so other worker processes reuse it; pid start times
+            # tell a live owner apart from a recycled pid
+            self._write_marker(url_key, {
+                'id': stream_id,
+                'pid': os.getpid(),
+                'pid_started': _process_start_time(os.getpid()),
+                'ffmpeg_pid': proc.pid,
+                'ffmpeg_started': _process_start_time(proc.pid),
+                'processed_url': stream_url,
+                'format': format_type,
+                'device_name': device_name,
+                'created_at': stream_info['created_at'],
+                'last_acquired': stream_info['last_acquired'],
+                'viewers': 1
+            })
             logger.info(f"Stream processed successfully: {format_type} -> {stream_url}")
             
             return True, stream_url, stream_info
             
         except Exception as e:
+            with self._streams_lock:
+                registered = stream_id in self.active_streams
+            if proc is not None and not registered:
+                self._stop_ffmpeg(proc)
             error_msg = f"Stream processing failed: {e}"
             logger.error(error_msg)
             return False, error_msg, None
     
-    def cleanup_stream(self, stream_id):
-        """Clean up stream resources"""
+    def cleanup_stream(self, stream_id, force=False):
+        """Release a viewer of a stream, cleaning up its resources once none remain"""
         try:
-            if stream_id in self.active_streams:
-                stream_info = self.active_streams[stream_id]
-                
-                # Stop HTTP server
-                if stream_info.get('httpd'):
-                    stream_info['httpd'].shutdown()
-                
-                # Remove stream directory
-                stream_dir = os.path.join(self.temp_dir, stream_id)
-                if os.path.exists(stream_dir):
-                    import shutil
-                    shutil.rmtree(stream_dir)
-                
-                # Remove from active streams
-                del self.active_streams[stream_id]
-                
-                logger.info(f"Cleaned up stream: {stream_id}")
+            with self._streams_lock:
+                stream_info = self.active_streams.get(stream_id)
+            if stream_info is None:
+                return self._release_shared_stream(stream_id)
+            
+            url_key = stream_info['url_key']
+            with self._url_lock(url_key):
+                if not force:
+                    with self._streams_lock:
+                        if stream_id not in self.active_streams:
+                            return False
+                        stream_info['refcount'] = max(stream_info['refcount'] - 1, 0)
+                    # Viewers in other workers count too; without a marker only ours do
+                    viewers = self._add_viewers(url_key, stream_id, -1)
+                    if viewers is None:
+                        viewers = stream_info['refcount']
+                    if viewers > 0:
+                        logger.info(f"Released stream {stream_id}, {viewers} viewers left")
+                        return True
+                return self._teardown(stream_id)
                 
         except Exception as e:
             logger.error(f"Stream cleanup failed: {e}")
+            return False
+    
+    def _release_shared_stream(self, stream_id):
+        """Release a viewer of a stream owned by another worker"""
+        url_key, marker = self._find_marker(stream_id)
+        if url_key is None:
+            return False
+        with self._url_lock(url_key):
+            marker = self._read_marker(url_key)
+            if not marker or marker.get('id') != stream_id:
+                return False
+            marker['viewers'] = marker.get('viewers', 1) - 1
+            if marker['viewers'] > 0:
+                self._write_marker(url_key, marker)
+                logger.info(f"Released shared stream {stream_id}, {marker['viewers']} viewers left")
+                return True
+            
+            # Last viewer anywhere: stop the owner's ffmpeg; its watcher tears the stream down
+            self._withdraw_marker(url_key, stream_id)
+            if self._marker_alive(marker):
+                threading.Thread(
+                    target=_stop_pid,
+                    args=(marker['ffmpeg_pid'], marker['ffmpeg_started']),
+                    daemon=True
+                ).start()
+            logger.info(f"Released last viewer of shared stream {stream_id}")
+            return True
+    
+    def _teardown(self, stream_id):
+        """Stop a local stream and remove its files; callers hold the URL lock"""
+        with self._streams_lock:
+            stream_info = self.active_streams.pop(stream_id, None)
+            if stream_info is None:
+                return False
+            if self._url_to_stream.get(stream_info['url_key']) == stream_id:
+                del self._url_to_stream[stream_info['url_key']]
+        
+        # Stop transcoding
+        if stream_info.get('ffmpeg_proc'):
+            self._stop_ffmpeg(stream_info['ffmpeg_proc'])
+        
+        # Withdraw the published marker if it still points at this stream
+        self._withdraw_marker(stream_info['url_key'], stream_id)
+        
+        # Remove stream directory in the background; a crashed ffmpeg can leave many segments
+        stream_dir = os.path.join(self.temp_dir, stream_id)
+        threading.Thread(
+            target=shutil.rmtree,
+            args=(stream_dir,),
+            kwargs={'ignore_errors': True},
+            daemon=True
+        ).start()
+        
+        logger.info(f"Cleaned up stream: {stream_id}")
+        return True
     
     def cleanup_old_streams(self, max_age_hours=1):
-        """Clean up old streams to prevent resource leaks"""
+        """Clean up streams nobody has acquired for a while to prevent resource leaks"""
         try:
-            current_time = time.time()
-            max_age_seconds = max_age_hours * 3600
+            cutoff = time.time() - max_age_hours * 3600
+            
+            candidates = {}
+            with self._streams_lock:
+                while self._expiry_heap and self._expiry_heap[0][0] < cutoff:
+                    acquired, stream_id = heapq.heappop(self._expiry_heap)
+                    stream_info = self.active_streams.get(stream_id)
+                    # Entries older than the last local acquire were superseded by a newer one
+                    if stream_info and stream_info['last_acquired'] <= acquired:
+                        candidates[stream_id] = stream_info
             
             expired_streams = []
-            for stream_id, stream_info in self.active_streams.items():
-                age = current_time - stream_info['created_at']
-                if age > max_age_seconds:
-                    expired_streams.append(stream_id)
+            for stream_id, stream_info in candidates.items():
+                # Viewers joining from other workers only show up in the marker
+                marker = self._read_marker(stream_info['url_key'])
+                if marker and marker.get('id') == stream_id and marker.get('last_acquired', 0) >= cutoff:
+                    with self._streams_lock:
+                        stream_info['last_acquired'] = marker['last_acquired']
+                        heapq.heappush(self._expiry_heap, (marker['last_acquired'], stream_id))
+                    continue
+                expired_streams.append(stream_id)
             
             for stream_id in expired_streams:
-                self.cleanup_stream(stream_id)
+                self.cleanup_stream(stream_id, force=True)
                 
             if expired_streams:
                 logger.info(f"Cleaned up {len(expired_streams)} expired streams")
@@ -292,16 +830,41 @@ class RTSPProcessor:
         except Exception as e:
             logger.error(f"Old stream cleanup failed: {e}")
     
+    def _build_status(self, stream_id, stream_info, viewers, now):
+        """Build the public status dict for a stream"""
+        return {
+            'id': stream_id,
+            'status': 'active',
+            'format': stream_info['format'],
+            'processed_url': stream_info['processed_url'],
+            'device_name': stream_info.get('device_name'),
+            'viewers': viewers,
+            'age_seconds': now - stream_info['created_at']
+        }
+    
     def get_stream_status(self, stream_id):
-        """Get status of a processed stream"""
-        if stream_id in self.active_streams:
-            stream_info = self.active_streams[stream_id]
-            return {
-                'id': stream_id,
-                'status': 'active',
-                'format': stream_info['format'],
-                'processed_url': stream_info['processed_url'],
-                'device_name': stream_info.get('device_name'),
-                'age_seconds': time.time() - stream_info['created_at']
-            }
-        return None
\ No newline at end of file
+        """Get status of a processed stream, whichever worker owns it"""
+        with self._streams_lock:
+            stream_info = self.active_streams.get(stream_id)
+        url_key, marker = self._find_marker(stream_id)
+        if stream_info:
+            viewers = marker.get('viewers', 1) if marker else stream_info['refcount']
+            return self._build_status(stream_id, stream_info, viewers, time.time())
+        if marker and self._marker_alive(marker):
+            return self._build_status(stream_id, marker, marker.get('viewers', 1), time.time())
+        return None
+    
+    def snapshot_statuses(self):
+        """Get status of all processed streams across worker processes in a single pass"""
+        now = time.time()
+        statuses = {}
+        # Markers cover every worker's streams, with viewer counts from all of them
+        for _, marker in self._iter_markers():
+            if 'id' in marker and self._marker_alive(marker):
+                statuses[marker['id']] = self._build_status(marker['id'], marker, marker.get('viewers', 1), now)
+        with self._streams_lock:
+            streams = list(self.active_streams.items())
+        for stream_id, stream_info in streams:
+            if stream_id not in statuses:
+                statuses[stream_id] = self._build_status(stream_id, stream_info, stream_info['refcount'], now)
+        return list(statuses.values())